@@ -1,10 +1,12 @@
 # Converts .html files from FimFiction
 
 import os
-import struct
-import bs4
 import re
-from collections import Counter
+import heapq
+import numpy as np
+from collections import defaultdict
+from multiprocessing import Pool
+from selectolax.lexbor import LexborHTMLParser
 
 import util
 from util import with_length
@@ -19,32 +21,41 @@ def compile(obj):
     elif isinstance(obj, bytes):  # compressed text
         return obj
     elif isinstance(obj, list):  # nav
-        sb = bytearray()
+        parts = []
         for el in obj:
             assert isinstance(el, tuple) and len(el) == 2
             el_type = b'0' if isinstance(el[1], list) else \
                       b'1' if isinstance(el[1], str) else \
                       b'2' if isinstance(el[1], bytes) else None
             assert el_type is not None
-            sb += el_type
-            sb += with_length(compile(el[0]))
-            sb += with_length(compile(el[1]))
-        return sb
+            name, content = compile(el[0]), compile(el[1])
+            parts.append(el_type)
+            parts.append(util.U32.pack(len(name)))
+            parts.append(name)
+            parts.append(util.U32.pack(len(content)))
+            parts.append(content)
+        return b''.join(parts)
     else:
         raise Exception('Incorrect hierarchy')
 
 CHUNKS_DELIMITER = 300
 
-def flatten(obj):
+def _flatten_parts(obj):
     if isinstance(obj, list):
-        return ''.join([flatten(e) + '\0' for e in obj])[:-1]
+        for i, e in enumerate(obj):
+            if i:
+                yield '\0'
+            yield from _flatten_parts(e)
     elif isinstance(obj, tuple):
-        return flatten(obj[1])  # do not flatten the name
+        yield from _flatten_parts(obj[1])  # do not flatten the name
     elif isinstance(obj, str):
-        return obj
+        yield obj
     else:
         raise Exception('Incorrect hierarchy')
 
+def flatten(obj):
+    return ''.join(_flatten_parts(obj))
+
 def inflate(struc, flattened):
     if isinstance(struc, tuple):
         got, flattened = inflate(struc[1], flattened)
@@ -72,6 +83,109 @@ def sheer_stone(initial_chars, rules):
     return ts
 
 
+def merge_group(seq, group, new_id):
+    ln = len(group)
+    if len(seq) < ln:
+        return seq
+    last = len(seq) - ln + 1
+    mask = seq[:last] == group[0]
+    for k in range(1, ln):
+        mask &= seq[k:last + k] == group[k]
+
+    # matches are sparse, so resolving overlaps (aaa -> Xa) left to right is cheap
+    starts = []
+    prev_end = 0
+    for i in np.flatnonzero(mask).tolist():
+        if i >= prev_end:
+            starts.append(i)
+            prev_end = i + ln
+    starts = np.array(starts, dtype=np.intp)
+
+    keep = np.ones(len(seq), dtype=bool)
+    for k in range(1, ln):
+        keep[starts + k] = False
+    new_seq = seq.copy()
+    new_seq[starts] = new_id
+    return new_seq[keep]
+
+
+def merge_pairs(seq, first_id, max_rules):
+    # Greedy pair merging over a linked list of positions. Pair counts live in a heap
+    # with lazy invalidation, so a merge only touches the neighbours of merged positions.
+    # Ties go to the pair seen first in the sequence, like Counter.most_common did.
+    # Tokens and links stay in numpy buffers; -1 marks a merged-away token / end of list.
+    tok = seq.astype(np.int32)
+    n = len(tok)
+    prv = np.arange(-1, n - 1, dtype=np.int32)
+    nxt = np.arange(1, n + 1, dtype=np.int32)
+    nxt[-1] = -1
+
+    positions = defaultdict(set)  # pair -> left positions
+    heap = []
+    if n > 1:
+        # group the left positions by pair in one sort, stable so each group is ascending
+        codes = (tok[:-1] << 16) | tok[1:]
+        order = np.argsort(codes, kind='stable')
+        for group in np.split(order, np.flatnonzero(np.diff(codes[order])) + 1):
+            code = int(codes[group[0]])
+            pair = (code >> 16, code & 0xFFFF)
+            positions[pair] = set(group.tolist())
+            if CHUNKS_DELIMITER not in pair:
+                heap.append((-len(group), int(group[0]), pair))
+    heapq.heapify(heap)
+
+    rules = {}
+    seq_len = n
+    while len(rules) < max_rules and heap:
+        cnt, first, pair = heapq.heappop(heap)
+        pos = positions.get(pair)
+        if not pos or len(pos) != -cnt or min(pos) != first:
+            continue  # stale entry
+        new_id = first_id + len(rules)
+        rules[new_id] = pair
+
+        a, b = pair
+        touched = set()
+        for i in sorted(positions.pop(pair)):
+            j = int(nxt[i])
+            if tok[i] != a or j == -1 or tok[j] != b:
+                continue  # consumed by an overlapping match
+            p, k = int(prv[i]), int(nxt[j])
+            tp = int(tok[p]) if p != -1 else -1
+            tk = int(tok[k]) if k != -1 else -1
+            if p != -1:
+                positions[(tp, a)].discard(p)
+                touched.add((tp, a))
+            if k != -1:
+                positions[(b, tk)].discard(j)
+                touched.add((b, tk))
+
+            tok[i] = new_id
+            tok[j] = -1
+            nxt[i] = k
+            if k != -1:
+                prv[k] = i
+            seq_len -= 1
+
+            if p != -1:
+                positions[(tp, new_id)].add(p)
+                touched.add((tp, new_id))
+            if k != -1:
+                positions[(new_id, tk)].add(i)
+                touched.add((new_id, tk))
+
+        for q in touched:
+            if positions[q] and CHUNKS_DELIMITER not in q:
+                heapq.heappush(heap, (-len(positions[q]), min(positions[q]), q))
+        positions.pop(pair, None)
+        if len(rules) % 16 == 0:
+            print(f'\rCompressed megaseq len: {seq_len}, rules: {len(rules)}   ', end='')
+    print(f'\rCompressed megaseq len: {seq_len}, rules: {len(rules)}   ', end='')
+
+    # the list only ever skips merged-away tokens, so it reads back in array order
+    return tok[tok >= 0], rules
+
+
 def compress(to_compress, max_tokens=256, forced=None):
     corpus = flatten(to_compress) + '\0'
 
@@ -79,80 +193,83 @@ def compress(to_compress, max_tokens=256, forced=None):
     char_to_id = {ch:i for i,ch in enumerate(initial_chars)}
     char_to_id['\0'] = CHUNKS_DELIMITER
 
-    seq = [char_to_id[ch] for ch in corpus]
+    # corpus is ASCII (sheer_stone stores one byte per char), map bytes to ids in one pass
+    lut = np.zeros(256, dtype=np.uint16)
+    for ch, i in char_to_id.items():
+        lut[ord(ch)] = i
+    seq = lut[np.frombuffer(corpus.encode('latin-1'), dtype=np.uint8)]
 
     if forced is None:
         forced = []
     #forced = ["Twilight", "Applejack", "Rainbow", "Pinkie", "Rarity", "Fluttershy"][::-1]
 
     rules = {}  # new_id -> list[old_id]
-    while len(initial_chars) + len(rules) < max_tokens:
-        if len(forced) == 0:
-            pairs = Counter((seq[i], seq[i+1]) for i in range(len(seq)-1))
-            for group, cnt in pairs.most_common():
-                if b'\0' not in group:
-                    break
-        else:
-            group = forced.pop()
-            if not isinstance(group, list):
-                group = [char_to_id[c] for c in group]
+    while forced and len(initial_chars) + len(rules) < max_tokens:
+        group = forced.pop()
+        if not isinstance(group, list):
+            group = [char_to_id[c] for c in group]
         new_id = len(initial_chars) + len(rules)
         rules[new_id] = group
-
-        new_seq = []
-        i = 0
-        group0 = group[0]  # cache friendly
-        group = list(group)
-        ln = len(group)
-        while i < len(seq):
-            if seq[i] == group0 and seq[i:i+ln] == group:
-                new_seq.append(new_id)
-                i += ln
-            else:
-                new_seq.append(seq[i])
-                i += 1
-        seq = new_seq
+        seq = merge_group(seq, group, new_id)
         print(f'\rCompressed megaseq len: {len(seq)}, rules: {len(rules)}   ', end='')
+
+    first_id = len(initial_chars) + len(rules)
+    seq, pair_rules = merge_pairs(seq, first_id, max_tokens - first_id)
+    rules.update(pair_rules)
     print()
 
-    compressed_books, flattened_more = inflate(to_compress, seq)
+    # inflate slices by chunk, the merged sequence is short enough for a list
+    compressed_books, flattened_more = inflate(to_compress, seq.tolist())
     assert len(flattened_more) == 0
     return sheer_stone(initial_chars, rules), compressed_books
 
 
-if __name__ == '__main__':
-    books = []
-    for fn in os.listdir('books'):
-        print('Processing', fn)
-        if not fn.lower().endswith(f".html"):
-            continue
-        s = bs4.BeautifulSoup(open('books/' + fn), features="lxml")
-        chapters = []
-        brief = text_encode(s.find_all('header')[0].text.strip('\n'))
-        book_name = brief.split('\n')[0]
-        chapters.append(('= Description =', brief))
-        for chapter in s.find_all('article'):
-            title = text_encode(chapter.find('h1').text.strip(' \n'))
-            texts = [""]
-            elements = chapter.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-            elements = [el for el in elements if not el.find_parent(['header', 'footer'])]
-            for el in elements:
-                if list(el.children)[0].name == 'i':
-                    text = '{ ' + el.text + ' }'
-                else:
-                    text = el.text
-                texts[-1] += text_encode(text)
-                if len(texts[-1]) < 10000:
-                    texts[-1] += '\n\n'
-                else:
-                    texts.append("")
-            if len(texts) == 1:
-                texts = texts[0]
+TEXT_TAGS = ('p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+def in_header_or_footer(node, root):
+    node = node.parent
+    while node is not None and node is not root:
+        if node.tag in ('header', 'footer'):
+            return True
+        node = node.parent
+    return False
+
+def parse_book(fn):
+    print('Processing', fn)
+    s = LexborHTMLParser(open('books/' + fn).read())
+    chapters = []
+    brief = text_encode(s.css_first('header').text().strip('\n'))
+    book_name = brief.split('\n')[0]
+    chapters.append(('= Description =', brief))
+    for chapter in s.css('article'):
+        title = text_encode(chapter.css_first('h1').text().strip(' \n'))
+        texts = [""]
+        elements = chapter.css(', '.join(TEXT_TAGS))
+        elements = [el for el in elements if not in_header_or_footer(el, chapter)]
+        for el in elements:
+            if el.child is not None and el.child.tag == 'i':
+                text = '{ ' + el.text() + ' }'
             else:
-                ln = len(texts)
-                texts = [(f'{i+1}/{ln}', text) for i, text in enumerate(texts)]
-            chapters.append((title, texts))
-        books.append((book_name, chapters))
+                text = el.text()
+            texts[-1] += text_encode(text)
+            if len(texts[-1]) < 10000:
+                texts[-1] += '\n\n'
+            else:
+                texts.append("")
+        if len(texts) == 1:
+            texts = texts[0]
+        else:
+            ln = len(texts)
+            texts = [(f'{i+1}/{ln}', text) for i, text in enumerate(texts)]
+        chapters.append((title, texts))
+    return book_name, chapters
+
+
+if __name__ == '__main__':
+    html_files = [fn for fn in os.listdir('books') if fn.lower().endswith(".html")]
+    # parsing is CPU-bound and holds the GIL, hence processes; imap keeps the listing order
+    with Pool() as pool:
+        books = list(pool.imap(parse_book, html_files))
 
     sheer_stone, books = compress(books)
     bb = compile(books)
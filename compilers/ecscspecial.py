@@ -1,19 +1,24 @@
 from PIL import Image
 import numpy as np
-from bitstring import BitArray
 from books import compress
 
 if __name__ == '__main__':
     img = Image.open('ecscspecial/0a356142c7184ae283480e277bf81dda.gif')
     #p = bytearray()
-    bitarrays = []
+    frames = []
     for i in range(4, img.n_frames):
         img.seek(i)
         frame = img.crop((125, 50, 375, 250)).resize((128, 64), Image.NEAREST).convert("1", dither=Image.NONE)
         by = np.frombuffer(frame.tobytes(), dtype=np.uint8)
         #p.extend(by)
-        bitarrays.append(BitArray(frame.tobytes()))
-    ll = [bitarrays[0].bin] + [(bitarrays[i] ^ bitarrays[i -1 ]).bin for i in range(1, len(bitarrays))]
+        frames.append(by)
+    frames = np.stack(frames)
+    deltas = np.empty_like(frames)
+    deltas[0] = frames[0]
+    deltas[1:] = frames[1:] ^ frames[:-1]
+    # compress works on text, one '0'/'1' character per pixel
+    bits = np.unpackbits(deltas, axis=1) + ord('0')
+    ll = [row.tobytes().decode('ascii') for row in bits]
     #open('ecscspecial/ecscspecial.bin', 'wb').write(p)
     c = compress(ll, 256)
     print()
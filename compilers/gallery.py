@@ -1,8 +1,9 @@
 import string
 import os
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
 
 import util
 
@@ -13,6 +14,7 @@ TEXT_SIZE = 32
 DEBUG = False
 
 def show_imgs(orig, down):
+    import matplotlib.pyplot as plt
     fig, axes = plt.subplots(1, 2, figsize=(10, 5))
 
     axes[0].imshow(orig)
@@ -25,48 +27,65 @@ def show_imgs(orig, down):
     plt.show()
 
 
+def process_image(fn):
+    print(f'{fn}')
+    img = Image.open('pictures/' + fn)
+    img = img.resize((128, 64), Image.LANCZOS)
+    img = img.convert("RGB")
+
+    arr = np.asarray(img)
+    h, w, c = arr.shape
+    arr = arr.reshape((h * w, c))
+    uniq, counts = np.unique(arr, axis=0, return_counts=True)
+    if len(uniq) <= 16:
+        # the colors are the palette; repeat them (most used first) so every LED gets one
+        uniq = uniq[np.argsort(-counts, kind='stable')]
+        cl = uniq[np.arange(16) % len(uniq)].astype(int)
+    else:
+        # fit on distinct colors weighted by pixel count, far fewer points than pixels
+        kmeans = MiniBatchKMeans(n_clusters=16, batch_size=1024, n_init=3, random_state=42)
+        kmeans.fit(uniq, sample_weight=counts)
+        cl = np.round(kmeans.cluster_centers_).astype(int)
+    if DEBUG:
+        import matplotlib.pyplot as plt
+        dc = Image.new("RGB", (16, 1))
+        dc.putdata([tuple(c) for c in cl])
+        dc = dc.resize((16 * 32, 32), Image.NEAREST)  # scale for visibility
+        plt.imshow(dc)
+        plt.axis("off")
+        plt.show()
+
+    blackwhite = img.convert("1", dither=Image.FLOYDSTEINBERG)
+    if DEBUG:
+        show_imgs(img, blackwhite)
+
+    fn = os.path.splitext(os.path.basename(fn))[0]
+    text = util.prepare_text(fn)
+    if len(text) > TEXT_SIZE:
+        text = text[:TEXT_SIZE // 2] + text[-TEXT_SIZE // 2:]
+    while len(text) < TEXT_SIZE:
+        text += '\0'
+
+    p = bytearray()
+    p.extend(np.frombuffer(blackwhite.tobytes(), dtype=np.uint8))
+    assert len(p) == IMAGE_SIZE
+    p.extend(cl.astype(np.uint8).tobytes())
+    assert len(p) == IMAGE_SIZE + COLOR_SIZE
+    p.extend(text.encode())
+    assert len(p) == IMAGE_SIZE + COLOR_SIZE + TEXT_SIZE
+    return p
+
+
 if __name__ == '__main__':
     bb = bytearray()
     bb += util.with_length(util.compile_info())
-    for fn in os.listdir('pictures'):
-        print(f'{fn}')
-        img = Image.open('pictures/' + fn)
-        img = img.resize((128, 64), Image.LANCZOS)
-        img = img.convert("RGB")
-
-        arr = np.asarray(img)
-        h, w, c = arr.shape
-        arr = arr.reshape((h * w, c))
-        kmeans = KMeans(n_clusters=16, random_state=42)
-        kmeans.fit(arr)
-        cl = np.round(kmeans.cluster_centers_).astype(int)
-        if DEBUG:
-            import matplotlib.pyplot as plt
-            dc = Image.new("RGB", (16, 1))
-            dc.putdata([tuple(c) for c in cl])
-            dc = dc.resize((16 * 32, 32), Image.NEAREST)  # scale for visibility
-            plt.imshow(dc)
-            plt.axis("off")
-            plt.show()
-
-        blackwhite = img.convert("1", dither=Image.FLOYDSTEINBERG)
-        if DEBUG:
-            show_imgs(img, blackwhite)
-
-        fn = os.path.splitext(os.path.basename(fn))[0]
-        text = util.prepare_text(fn)
-        if len(text) > TEXT_SIZE:
-            text = text[:TEXT_SIZE // 2] + text[-TEXT_SIZE // 2:]
-        while len(text) < TEXT_SIZE:
-            text += '\0'
-
-        p = bytearray()
-        p.extend(np.frombuffer(blackwhite.tobytes(), dtype=np.uint8))
-        assert len(p) == IMAGE_SIZE
-        p.extend(cl.astype(np.uint8).tobytes())
-        assert len(p) == IMAGE_SIZE + COLOR_SIZE
-        p.extend(text.encode())
-        assert len(p) == IMAGE_SIZE + COLOR_SIZE + TEXT_SIZE
+    files = sorted(os.listdir('pictures'))
+    if DEBUG:  # plots need the main process
+        entries = map(process_image, files)
+    else:
+        with ProcessPoolExecutor() as ex:
+            entries = list(ex.map(process_image, files))
+    for p in entries:
         bb.extend(p)
 
     print('gallery.bin size: ', len(bb))
@@ -185,22 +185,31 @@ Format: Output the corrected TIMESTAMPED and nothing else.
             f.write(corrected)
 
 
+WORDS_SUFFIX_RE = re.compile(r"_words.*\.txt$")
+FEAT_RE = re.compile(r"\(feat[^)]*\)", flags=re.IGNORECASE)
+
 def song_name(fn):
-    base = re.sub(r"_words.*\.txt$", "", fn)
+    base = WORDS_SUFFIX_RE.sub("", fn)
     base = os.path.splitext(base)[0]
-    base = re.sub(r"\(feat[^)]*\)", "", base, flags=re.IGNORECASE).strip()
+    base = FEAT_RE.sub("", base).strip()
     name = base.split(" - ")[-1].strip()
     print(f'Song name: {name}')
     return name
 
 
+WORD_HEADER = struct.Struct("<BB")  # duration, length
+
 def encode_word(word, duration):
     pw = util.prepare_text(word.strip(' \t')).encode()
     pw = pw[:50]
-    if duration < 256:
-        return struct.pack("<BB", duration, len(pw)) + pw
-    else:
-        return encode_word(word, 255) + encode_word(word, duration - 255)
+    parts = []
+    while duration >= 256:  # long words and silences are split into 255-frame pieces
+        parts.append(WORD_HEADER.pack(255, len(pw)))
+        parts.append(pw)
+        duration -= 255
+    parts.append(WORD_HEADER.pack(duration, len(pw)))
+    parts.append(pw)
+    return b''.join(parts)
 
 
 def txt_to_bin():
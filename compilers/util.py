@@ -1,21 +1,49 @@
 from datetime import datetime
+from functools import lru_cache
 import struct
 
 CHARSET = """\n !"#$%&'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~"""
 TRANSITIONS = {'“': '"', '”': '"', '…': '...', "’": "'", "‘": "'", "—": '---', 'á': "a'", 'é': "e'", 'ï': 'ii',
                'ç': 'c,', '№': 'No', 'â': 'a', 'è': 'e`', '\t': '   ', "–": "-"}
+_KNOWN_CHARS = frozenset(CHARSET) | TRANSITIONS.keys()
+
+class _TranslationTable(dict):
+    """str.translate table: CHARSET kept, TRANSITIONS substituted, anything else -> fallback"""
+    def __init__(self, fallback):
+        super().__init__({ord(c): c for c in CHARSET})
+        self.update({ord(k): v for k, v in TRANSITIONS.items()})
+        self.fallback = fallback
+
+    def __missing__(self, key):
+        return self.fallback
+
+_TABLES = {}
+
+def _translate(txt, fallback):
+    table = _TABLES.get(fallback)
+    if table is None:
+        table = _TABLES[fallback] = _TranslationTable(fallback)
+    return txt.translate(table)
+
+# songs and gallery prepare short, often repeated strings; book paragraphs go through loud
+_translate_cached = lru_cache(maxsize=65536)(_translate)
 
 def prepare_text(txt, fallback='', loud=False):
+    if not txt:
+        return ''
     if loud:
-        unk = [c for c in list(set(txt)) if c not in CHARSET and c not in TRANSITIONS]
+        unk = set(txt) - _KNOWN_CHARS
         if len(unk) != 0:
             print('unknown characters:', [(u, u.encode().hex()) for u in unk])
-    return ''.join(c if c in CHARSET else TRANSITIONS[c] if c in TRANSITIONS else fallback for c in txt)
+        return _translate(txt, fallback)
+    return _translate_cached(txt, fallback)
 
 
 def compile_info():
     return f'generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'.encode()
 
 
+U32 = struct.Struct("<I")
+
 def with_length(obj):
-    return struct.pack("<I", len(obj)) + obj
+    return U32.pack(len(obj)) + obj
@@ -7,7 +7,8 @@ import socket
 import ssl
 import json
 import uasyncio as asyncio
-import time, micropython
+import time
+from micropython import const
 from machine import Pin, I2C
 import ssd1306, neopixel
 import math
@@ -15,6 +16,7 @@ import gc
 import framebuf
 import struct
 import random
+import array
 
 # Writer
 from writer.writer import Writer
@@ -27,12 +29,18 @@ import writer.celestia16 as font_small
 # -----------------------
 I2C_SCL = 1
 I2C_SDA = 0
+I2C_FREQ = 400000            # Fast-mode, the SSD1306's rated speed
+# Opt-in Fast-mode Plus (1000000) for boards with stiff (~1-2 kOhm) pull-ups.
+# The stock badge does not qualify: its OLED lines have 5.1 kOhm pull-ups
+# (R71/R72), and slow edges corrupt frames without any error being raised.
+I2C_FAST_FREQ = None
 OLED_WIDTH = 128
 OLED_HEIGHT = 64
 
 NEOPIXEL_PIN = 3
-NEOPIXEL_COUNT = 16
+NEOPIXEL_COUNT = const(16)  # folded into the effects at compile time
 NEOPIXEL_FPS = 50
+FRAME_MS = 1000 // NEOPIXEL_FPS
 
 # Buttons
 BTN_NEXT_PIN = 5      # Next / Increase
@@ -40,6 +48,7 @@ BTN_PREV_PIN = 8      # Previous / Decrease
 BTN_SELECT_PIN = 4    # Enter
 BTN_BACK_PIN = 9      # Back
 DEBOUNCE_MS = 50
+BUTTON_POLL_MS = 5    # shift-register sampling period, 8 samples = 40 ms stable
 
 # Auto-repeat
 REPEAT_DELAY = 500     # ms before auto-repeat starts
@@ -60,17 +69,32 @@ BTN_SELECT = 3
 BTN_BACK = 4
 
 btn_state = {}       # {btn_id: pressed or not}
-repeat_tasks = {}    # {btn_id: task}
-_last_event_ms = {}  # debounce tracking
+_press_ms = [0] * 5  # per btn_id: tick of the last press, for auto-repeat
+_repeat_wake = asyncio.Event()  # set when Next/Prev goes down
+_relax_deadline = [0] * 5  # per btn_id: edges before this tick are bounces
+_btn_pins = {}       # {btn_id: Pin}
+_btn_shift = [0xFF] * 5  # per btn_id: last 8 pin samples, 1 = released
+# IRQ -> button_dispatch_task queue, entries are (btn_id << 1) | pin level
+_evt_buf = bytearray(16)
+_evt_head = 0
+_evt_tail = 0
+_evt_flag = asyncio.ThreadSafeFlag()
 
-i2c_oled = I2C(0, scl=Pin(I2C_SCL), sda=Pin(I2C_SDA))
-oled = ssd1306.SSD1306_I2C(OLED_WIDTH, OLED_HEIGHT, i2c_oled)
+try:
+    i2c_oled = I2C(0, scl=Pin(I2C_SCL), sda=Pin(I2C_SDA), freq=I2C_FAST_FREQ or I2C_FREQ)
+    oled = ssd1306.SSD1306_I2C(OLED_WIDTH, OLED_HEIGHT, i2c_oled)
+except OSError:
+    if not I2C_FAST_FREQ:
+        raise
+    # the display does not answer at the fast rate, use the rated one
+    i2c_oled = I2C(0, scl=Pin(I2C_SCL), sda=Pin(I2C_SDA), freq=I2C_FREQ)
+    oled = ssd1306.SSD1306_I2C(OLED_WIDTH, OLED_HEIGHT, i2c_oled)
 wri6  = Writer(oled, font_small, verbose=False)
 wri10 = Writer(oled, font_medium, verbose=False)
 wri20 = Writer(oled, font_large, verbose=False)
 
 username_wri = wri20
-username_lines = None
+_username_cache = {}  # {(name, id(writer)): ((y, x, line), ...)}
 
 # -----------------------
 # Parameters
@@ -87,7 +111,7 @@ class Parameter:
 # -----------------------
 
 led_startup    = True
-led_effects    = []
+led_effects    = ()
 led_effect     = Parameter("Light_effect", 0, 3)
 led_brightness = Parameter("Brightness", 10, 100)
 led_hue        = Parameter("Hue", 180, 360)
@@ -111,19 +135,51 @@ snake_high_score = Parameter("SnakeHighScore", 0, 9999)
 params["SnakeHighScore"] = snake_high_score
 
 FILENAME = "params.json"
+SAVE_DELAY_MS = 5000
+# the stored set is fixed, so it is formatted straight from a template
+# instead of going through the generic JSON encoder
+PARAMS_JSON = '{"Brightness":%d,"Hue":%d,"Saturation":%d,"Speed":%d,"Light_effect":%d,"SnakeHighScore":%d}'
+
+_saved_params = None  # what FILENAME holds, to skip writes that change nothing
+_save_task = None
+
+def _param_values():
+    return (led_brightness.value, led_hue.value, led_sat.value, led_speed.value,
+            led_effect.value, snake_high_score.value)
 
 def save_params():
-    data = {name: param.value for name, param in params.items()}
-    with open(FILENAME, "w") as f:
-        json.dump(data, f)
+    global _saved_params
+    values = _param_values()
+    if values == _saved_params:
+        return
+    # write aside and rename over, so a reset mid-write keeps the old file
+    with open(FILENAME + ".tmp", "w") as f:
+        f.write(PARAMS_JSON % values)
+    os.rename(FILENAME + ".tmp", FILENAME)
+    _saved_params = values
+
+async def _delayed_save():
+    global _save_task
+    await asyncio.sleep_ms(SAVE_DELAY_MS)
+    _save_task = None
+    save_params()
+
+def schedule_save():
+    """Save the parameters once they have been left alone for SAVE_DELAY_MS."""
+    global _save_task
+    if _save_task is not None:
+        _save_task.cancel()
+    _save_task = asyncio.create_task(_delayed_save())
 
 def load_params():
+    global _saved_params
     try:
         with open(FILENAME, "r") as f:
-            data = json.load(f)
-            for name, val in data.items():
-                if name in params:
-                    params[name].value = val
+            data = json.loads(f.read())
+        for name, val in data.items():
+            if name in params:
+                params[name].value = val
+        _saved_params = _param_values()
     except OSError:
         # file not found, keep defaults
         pass
@@ -132,9 +188,12 @@ def load_params():
 # Username
 # -----------------------
 USERNAME = "Semjon/Sona Kravtsenko"
-if 'USERNAME.txt' in os.listdir():
+try:
     with open('USERNAME.txt', "r") as f:
         USERNAME = f.read()
+except OSError:
+    # no file flashed, keep the default
+    pass
 
 # -----------------------
 # Hardware init
@@ -156,28 +215,33 @@ def _push_button(btn_id):
     if button_event:
         button_event.set()
 
-def _schedule_push(btn):
-    btn_id, pin_state = btn
-    now = time.ticks_ms()
-    if time.ticks_diff(now, _last_event_ms.get(btn_id, 0)) < DEBOUNCE_MS:
-        return
-    _last_event_ms[btn_id] = now
-
+def _apply_button(btn_id, pin_state):
+    if btn_state.get(btn_id, 0) == (pin_state == 0):
+        return  # already there, e.g. the poller saw it first
     if pin_state == 0:  # pressed
         btn_state[btn_id] = 1
         _push_button(btn_id)
-        # start repeat task for Next/Prev
+        # Next/Prev auto-repeat while held, see button_repeat_task
         if btn_id in (BTN_NEXT, BTN_PREV):
-            repeat_tasks[btn_id] = asyncio.create_task(_repeat_task(btn_id))
+            _press_ms[btn_id] = time.ticks_ms()
+            _repeat_wake.set()
     else:  # released
         btn_state[btn_id] = 0
-        t = repeat_tasks.pop(btn_id, None)
-        if t:
-            t.cancel()
 
 def make_irq(btn_id):
     def handler(pin):
-        micropython.schedule(_schedule_push, (btn_id, pin.value()))
+        global _evt_head
+        # debounce right in the IRQ so bounces never reach the queue
+        now = time.ticks_ms()
+        if time.ticks_diff(now, _relax_deadline[btn_id]) < 0:
+            return
+        _relax_deadline[btn_id] = time.ticks_add(now, DEBOUNCE_MS)
+        # only queue the edge here, button_dispatch_task does the rest
+        nxt = (_evt_head + 1) & 15
+        if nxt != _evt_tail:  # drop the edge if the queue is full
+            _evt_buf[_evt_head] = (btn_id << 1) | pin.value()
+            _evt_head = nxt
+        _evt_flag.set()
     return handler
 
 def setup_buttons():
@@ -187,16 +251,42 @@ def setup_buttons():
            (BTN_BACK_PIN, BTN_BACK)]
     for pin_num, btn_id in cfg:
         p = Pin(pin_num, Pin.IN)  # external pull-ups
+        _btn_pins[btn_id] = p
         p.irq(trigger=Pin.IRQ_FALLING|Pin.IRQ_RISING, handler=make_irq(btn_id))
 
-async def _repeat_task(btn_id):
-    try:
-        await asyncio.sleep_ms(REPEAT_DELAY)
-        while btn_state[btn_id]:
-            _push_button(btn_id)
+async def button_poll_task():
+    # The IRQ reacts to the first edge, but an edge that lands inside its relax
+    # window is lost. Sample the pins into 8-bit shift registers and resync the
+    # button state whenever a pin has been stable for 8 samples.
+    while True:
+        for btn_id, p in _btn_pins.items():
+            s = ((_btn_shift[btn_id] << 1) | p.value()) & 0xFF
+            _btn_shift[btn_id] = s
+            if s == 0x00 or s == 0xFF:
+                _apply_button(btn_id, s & 1)
+        await asyncio.sleep_ms(BUTTON_POLL_MS)
+
+async def button_dispatch_task():
+    global _evt_tail
+    while True:
+        await _evt_flag.wait()
+        while _evt_tail != _evt_head:
+            e = _evt_buf[_evt_tail]
+            _evt_tail = (_evt_tail + 1) & 15
+            _apply_button(e >> 1, e & 1)
+
+async def button_repeat_task():
+    # one long-lived task for auto-repeat instead of a new task per press
+    while True:
+        await _repeat_wake.wait()
+        _repeat_wake.clear()
+        while btn_state.get(BTN_NEXT, 0) or btn_state.get(BTN_PREV, 0):
+            now = time.ticks_ms()
+            for btn_id in (BTN_NEXT, BTN_PREV):
+                if btn_state.get(btn_id, 0) and \
+                        time.ticks_diff(now, _press_ms[btn_id]) >= REPEAT_DELAY:
+                    _push_button(btn_id)
             await asyncio.sleep_ms(REPEAT_INTERVAL)
-    except asyncio.CancelledError:
-        return
 
 # -----------------------
 # Screen base class
@@ -212,6 +302,19 @@ class Screen:
     async def handle_button(self, btn):
         pass
 
+    def _ellipsize(self, writer, text, max_w):
+        """text, or its longest prefix + "..." that fits in max_w pixels."""
+        if writer.stringlen(text) <= max_w:
+            return text
+        # glyph widths add up, so walk the prefix once and cut the string once
+        room = max_w - writer.stringlen("...")
+        px = 0
+        for k in range(len(text)):
+            px += writer.stringlen(text[k])
+            if px > room:
+                return text[:k] + "..."
+        return text + "..."
+
 # -----------------------
 # Lights screens
 # -----------------------
@@ -223,6 +326,7 @@ class ParamScreen(Screen):
         self.returnscreen = returnscreen
         self.barfill = barfill
         self.wraparound = wraparound
+        self.require_full_render = True
 
     def render(self):
         self.oled.fill(0)
@@ -244,17 +348,30 @@ class ParamScreen(Screen):
         # Numeric display
         self.writer.set_textpos(self.oled, 50, 0)
         self.writer.printstring("{}: {:3d}".format(self.param.name, val))
-        self.oled.show()
+        if self.require_full_render:
+            self.require_full_render = False
+            self.oled.show()
+        else:
+            # only the bar and the value below it change
+            self.oled.show_region(0, bar_y, self.oled.width - 1, self.oled.height - 1)
 
     async def handle_button(self, btn):
-        if btn == BTN_NEXT and (self.wraparound or self.param.value < self.param.maxval):
-            self.param.value = (self.param.value + 1) % (self.param.maxval + 1)
-        elif btn == BTN_PREV and (self.wraparound or self.param.value > 0):
-            self.param.value = (self.param.value - 1) % (self.param.maxval + 1)
+        if btn == BTN_NEXT:
+            self._set(self.param.value + 1)
+        elif btn == BTN_PREV:
+            self._set(self.param.value - 1)
         elif btn in (BTN_SELECT, BTN_BACK):
             return self.returnscreen(self.oled)
         return self
 
+    def _set(self, val):
+        # wrap around the ends, or stop at them
+        maxval = self.param.maxval
+        if self.wraparound:
+            self.param.value = val % (maxval + 1)
+        else:
+            self.param.value = min(max(val, 0), maxval)
+
 class BrightnessScreen(ParamScreen):
     def __init__(self, oled):
         super().__init__(oled, wri10, led_brightness, LightsScreen, barfill=True, wraparound=False)
@@ -284,16 +401,19 @@ class ListScreen(Screen):
         # metrics
         self.line_height = self.listwriter.font.height()
         self.rows = 3  # room below header
+        self._drawn = None  # (index, offset) on the display, None when it needs a redraw
 
     async def handle_button(self, btn):
         if btn == BTN_NEXT:
             self.index = (self.index + 1) % len(self.items)
         elif btn == BTN_PREV:
             self.index = (self.index - 1) % len(self.items)
-        elif btn == BTN_BACK:
-            return self.on_back()
-        elif btn == BTN_SELECT:
-            return self.on_select(self.index)
+        elif btn in (BTN_BACK, BTN_SELECT):
+            nxt = self.on_back() if btn == BTN_BACK else self.on_select(self.index)
+            if nxt is not self:
+                # another screen draws over this one, redraw if it hands us back
+                self._drawn = None
+            return nxt
 
         # adjust scroll offset
         if self.index < self.offset:
@@ -304,16 +424,20 @@ class ListScreen(Screen):
         return self
 
     def render(self):
+        key = (self.index, self.offset)
+        if key == self._drawn:
+            return  # display already shows this selection
+        self._drawn = key
+
         self.oled.fill(0)
         self.headerwriter.set_textpos(self.oled, 0, 0)
         self.headerwriter.printstring(self.title)
 
-        visible = range(self.offset, min(len(self.items), self.offset + self.rows))
-        for row, i in enumerate(visible):
-            y = 19 + row * 14
-            text = "{}{}".format(">" if i == self.index else " ", self.items[i][0])
+        y = 19
+        for i in range(self.offset, min(len(self.items), self.offset + self.rows)):
             self.listwriter.set_textpos(self.oled, y, 0)
-            self.listwriter._printline_nobreak(text)
+            self.listwriter._printline_nobreak((">" if i == self.index else " ") + self.items[i][0])
+            y += 14
         self.oled.show()
 
     # --- to be customized in child classes ---
@@ -350,7 +474,7 @@ class LightsScreen(ListScreen):
         return cls(self.oled)
 
     def on_back(self):
-        save_params()
+        schedule_save()
         return MenuScreen(self.oled)
 
 
@@ -359,6 +483,7 @@ class LightsScreen(ListScreen):
 # -----------------------
 stopwatch_running = False
 stopwatch_start_ms = 0
+stopwatch_base_ms = 0  # elapsed before the current run, kept while the screen is closed
 class StopwatchScreen(Screen):
     """
     Simple stopwatch with live updating.
@@ -369,20 +494,27 @@ class StopwatchScreen(Screen):
     """
     def __init__(self, oled):
         super().__init__(oled)
-        self.elapsed_ms = 0
+        self.elapsed_ms = stopwatch_base_ms
+        # set on start/stop so a stopped stopwatch's updater sleeps until then
+        self._state_changed = asyncio.Event()
         # start a small updater so time refreshes while running
         self._ticker = asyncio.create_task(self._tick())
         self.require_full_render = True
         self.timestr = ''
-        self.strlen_wo_cs = wri20.stringlen("00:00:00.")  # constant, thanks to the used font
 
     async def _tick(self):
-        global stopwatch_running
+        render = self.render
+        state_changed = self._state_changed
+        sleep_ms = asyncio.sleep_ms
         try:
             while True:
-                if screen is self and stopwatch_running:
-                    self.render()
-                await asyncio.sleep_ms(100)
+                if stopwatch_running:
+                    if screen is self:
+                        render()
+                    await sleep_ms(100)
+                else:
+                    await state_changed.wait()
+                    state_changed.clear()
         except asyncio.CancelledError:
             return
 
@@ -394,17 +526,31 @@ class StopwatchScreen(Screen):
 
     def render(self):
         # update elapsed if running
-        global stopwatch_running, stopwatch_start_ms
         if stopwatch_running:
-            now = time.ticks_ms()
-            self.elapsed_ms = time.ticks_add(
-                time.ticks_diff(now, stopwatch_start_ms), 0
-            ) + self._paused_base
+            self.elapsed_ms = stopwatch_base_ms + time.ticks_diff(time.ticks_ms(), stopwatch_start_ms)
+
+        timestr = self._fmt(self.elapsed_ms)
+        if not self.require_full_render:
+            # ticking only changes the time line, and mostly just its centiseconds
+            if timestr == self.timestr:
+                return
+            x = self._cs_x if timestr[:-2] == self.timestr[:-2] else 0
+            self.oled.fill_rect(x, 0, self.oled.width - x, wri20.height, 0)
+            wri20.set_textpos(self.oled, 0, x)
+            wri20.printstring(timestr[-2:] if x else timestr)
+            if not x:
+                self._cs_x = wri20.stringlen(timestr[:-2])
+            self.timestr = timestr
+            self.oled.show_region(x, 0, self.oled.width - 1, wri20.height - 1)
+            return
 
+        self.require_full_render = False
         self.oled.fill(0)
         # Time (big)
         wri20.set_textpos(self.oled, 0, 0)
-        wri20.printstring(self._fmt(self.elapsed_ms) + '\n')
+        wri20.printstring(timestr + '\n')
+        self._cs_x = wri20.stringlen(timestr[:-2])
+        self.timestr = timestr
         # Hints
         wri6.set_textpos(self.oled, 30, 0)
         if stopwatch_running:
@@ -416,22 +562,22 @@ class StopwatchScreen(Screen):
         self.oled.show()
 
     async def handle_button(self, btn):
-        global stopwatch_running, stopwatch_start_ms
+        global stopwatch_running, stopwatch_start_ms, stopwatch_base_ms
         self.require_full_render = True
         if btn == BTN_SELECT:
             if not stopwatch_running:
-                # starting: remember base elapsed (supports resume)
-                self._paused_base = self.elapsed_ms
+                # starting: stopwatch_base_ms holds the elapsed so far (supports resume)
                 stopwatch_start_ms = time.ticks_ms()
                 stopwatch_running = True
             else:
                 # stopping: lock in elapsed
-                now = time.ticks_ms()
-                self.elapsed_ms = self._paused_base + time.ticks_diff(now, stopwatch_start_ms)
+                stopwatch_base_ms += time.ticks_diff(time.ticks_ms(), stopwatch_start_ms)
+                self.elapsed_ms = stopwatch_base_ms
                 stopwatch_running = False
+            self._state_changed.set()
         elif btn == BTN_PREV and not stopwatch_running:
             self.elapsed_ms = 0
-            self._paused_base = 0
+            stopwatch_base_ms = 0
         elif btn == BTN_BACK:
             # stop updater task when leaving
             self._ticker.cancel()
@@ -439,9 +585,6 @@ class StopwatchScreen(Screen):
         self.render()
         return self
 
-    # initialize paused base
-    _paused_base = 0
-
 
 class GalleryScreen(Screen):
     IMAGE_SIZE = 1024      # 128*64 bits / 8
@@ -456,6 +599,10 @@ class GalleryScreen(Screen):
         self.current_colors = None
         self.current_text = ''
         self.info_mode = False
+        # one set of buffers reused for every image, so browsing does not fragment the heap
+        self._fb_data = bytearray(self.IMAGE_SIZE)
+        self._color_data = bytearray(self.COLOR_SIZE)
+        self._text_data = bytearray(self.TEXT_SIZE)
 
         with open('gallery.bin', "rb") as f:
             compileinfo = f.read(struct.unpack("<I", f.read(4))[0])
@@ -466,19 +613,16 @@ class GalleryScreen(Screen):
         self.load_current_image()
 
     def load_current_image(self):
-        if self.current_fb:
-            del self.current_fb
-            del self.current_colors
-            self.current_fb = None
-            self.current_colors = None
-            gc.collect()
-
+        fb_data = self._fb_data
+        color_data = self._color_data
+        text_data = self._text_data
         with open('gallery.bin', "rb") as f:
             f.seek(self.base_offset + self.index * self.ENTRY_SIZE)
-            fb_data = bytearray(f.read(self.IMAGE_SIZE))
-            color_data = bytearray(f.read(self.COLOR_SIZE))
-            text_data = bytearray(f.read(self.TEXT_SIZE))
-        self.current_fb = framebuf.FrameBuffer(fb_data, 128, 64, framebuf.MONO_HLSB)
+            f.readinto(fb_data)
+            f.readinto(color_data)
+            f.readinto(text_data)
+        if self.current_fb is None:
+            self.current_fb = framebuf.FrameBuffer(fb_data, 128, 64, framebuf.MONO_HLSB)
         self.current_colors = tuple(
             (color_data[i], color_data[i+1], color_data[i+2])
             for i in range(0, self.COLOR_SIZE, 3)
@@ -516,6 +660,11 @@ class GalleryScreen(Screen):
 
     def on_back(self):
         self.info_mode = False
+        # hand the image buffers back right away instead of whenever the GC runs
+        self.current_fb = None
+        self.current_colors = None
+        self._fb_data = self._color_data = self._text_data = None
+        gc.collect()
         return MenuScreen(self.oled)
 
 
@@ -727,6 +876,26 @@ class BooksScreen(ListScreen):
 # -----------------------
 # Text screens
 # -----------------------
+_glyph_w_cache = {}  # {font: {char: width}}, shared by every text wrap
+
+def glyph_widths(font):
+    """Glyph widths of font, filled in as the wrappers meet new characters."""
+    widths = _glyph_w_cache.get(font)
+    if widths is None:
+        widths = _glyph_w_cache[font] = {}
+    return widths
+
+def text_width(font, s):
+    """Same as Writer.stringlen, but each glyph of font is only looked up once."""
+    glyph_w = glyph_widths(font)
+    px = 0
+    for c in s:
+        cw = glyph_w.get(c)
+        if cw is None:
+            cw = glyph_w[c] = font.get_ch(c)[2]
+        px += cw
+    return px
+
 
 class TextScreen(Screen):
     def __init__(self, oled, writer, text, back_screen=None):
@@ -746,8 +915,12 @@ class TextScreen(Screen):
     def _wrap_text(self, text):
         gc.collect()
 
-        space_w = self.wri.stringlen(" ")
-        tilda_w = self.wri.stringlen("~")
+        font = self.wri.font
+        glyph_w = glyph_widths(font)  # filled by text_width, read when splitting words
+
+        max_w = self.oled.width
+        space_w = text_width(font, " ")
+        tilda_w = text_width(font, "~")
         lines = []
         # split paragraphs by explicit newline
         if isinstance(text, str):
@@ -758,33 +931,40 @@ class TextScreen(Screen):
                 continue
             line, line_px = [], 0
             for word in para.split():
-                w_px = self.wri.stringlen(word)
+                w_px = text_width(font, word)
                 needed = line_px + (space_w if line else 0) + w_px
-                if needed <= self.oled.width:
+                if needed <= max_w:
                     line.append(word)
                     line_px = needed
-                elif w_px <= self.oled.width:
+                elif w_px <= max_w:
                     lines.append(" ".join(line))
                     line, line_px = [word], w_px
                 else:
+                    # widths of word[:start] and word[start:here], kept up to date
+                    # instead of re-measuring the slices
                     start = 0
                     here = 0
+                    start_px = 0
+                    seg_px = 0
                     while start != len(word):
-                        while line_px + space_w + self.wri.stringlen(word[start:here + 1]) + tilda_w \
-                                <= self.oled.width:
+                        while line_px + space_w + seg_px + glyph_w[word[here]] + tilda_w <= max_w:
+                            seg_px += glyph_w[word[here]]
                             here += 1
                             if here == len(word):
                                 break
-                        if line_px + space_w + self.wri.stringlen(word[start:]) <= self.oled.width:
+                        if line_px + space_w + w_px - start_px <= max_w:
                             here = len(word)
+                            seg_px = w_px - start_px
                         if here == len(word):  # exit route
                             line.append(word[start:here])
-                            line_px += space_w + self.wri.stringlen(word[start:here])
+                            line_px += space_w + seg_px
                             break
                         else:
                             if start != here:
                                 line.append(word[start:here] + '~')
                                 start = here
+                                start_px += seg_px
+                                seg_px = 0
                             lines.append(" ".join(line))
                             line, line_px = [], 0
             if line:
@@ -817,7 +997,18 @@ class TextScreen(Screen):
         return self
 
 class AboutScreen(TextScreen):
+    # wrapped lines, kept for the next visit; the .bin files only change on reflash
+    _lines = None
+
     def __init__(self, oled):
+        super().__init__(oled, wri6, None)
+
+    def _wrap_text(self, text):
+        if AboutScreen._lines is None:
+            AboutScreen._lines = super()._wrap_text(self._compose_text())
+        return AboutScreen._lines
+
+    def _compose_text(self):
         text = (
             "BSides Tallinn 2025 badge.\n"
             "Mod by Sona.\n\n"
@@ -825,7 +1016,7 @@ class AboutScreen(TextScreen):
             "Upstream: github.com/ks000/\nbsides_badge\n"
             "Uses the amazing Equestria Medium Redux font.\n"
             "Some light effects contributed by boxmein.\n"
-            "Main colors extraction by sklearn's KMeans.\n"
+            "Main colors extraction by sklearn's MiniBatchKMeans over unique colors, weighted by frequency.\n"
             "Lyrics recognition and alignment by Whisper.\n"
             "\n"
         )
@@ -838,7 +1029,7 @@ class AboutScreen(TextScreen):
                     text += f'{fn} says: {compileinfo.decode()}.\n'
             except:
                 text += f'{fn} exists.\n'
-        super().__init__(oled, wri6, text)
+        return text
 
 class SnakeScreen(Screen):
     """
@@ -865,6 +1056,9 @@ class SnakeScreen(Screen):
         self.GRID_W = OLED_WIDTH // self.CELL           # 32
         self.GRID_H = (OLED_HEIGHT - self.HUD_H) // self.CELL  # e.g. 12
         self.GRID_Y0 = self.HUD_H                       # playfield starts below HUD
+        # whole MONO_VLSB pages of the HUD band (both of them with a 16 px font),
+        # cleared by copying zeros over the start of the buffer
+        self._hud_blank = bytes(self.HUD_H // 8 * self.oled.width)
 
         # Playfield pixel bounds
         self.x_left   = 0
@@ -888,7 +1082,20 @@ class SnakeScreen(Screen):
         self.dir_idx = 0  # right
         cx = self.GRID_W // 2
         cy = self.GRID_H // 2
-        self.snake = [(cx, cy), (cx-1, cy), (cx-2, cy), (cx-3, cy)]
+        # Body as a ring buffer of cell coordinates: segment k (0 = head) is at
+        # index (head + k) % cap. Moving writes one new head and drops the tail
+        # by shortening length, nothing is shifted or allocated.
+        cap = self.GRID_W * self.GRID_H
+        self.xs = bytearray(cap)
+        self.ys = bytearray(cap)
+        # one bit per cell (index y * GRID_W + x), set while the body covers it
+        self.occ = bytearray((cap + 7) >> 3)
+        for k in range(4):
+            self.xs[k] = cx - k
+            self.ys[k] = cy
+            self._set_cell(cx - k, cy)
+        self.head = 0
+        self.length = 4
         self.food = self._rand_empty_cell()
         self.game_over = False
 
@@ -898,7 +1105,16 @@ class SnakeScreen(Screen):
 
     # ---------- helpers ----------
     def _cell_free(self, x, y):
-        return (x, y) not in self.snake
+        idx = y * self.GRID_W + x
+        return not self.occ[idx >> 3] & (1 << (idx & 7))
+
+    def _set_cell(self, x, y):
+        idx = y * self.GRID_W + x
+        self.occ[idx >> 3] |= 1 << (idx & 7)
+
+    def _clear_cell(self, x, y):
+        idx = y * self.GRID_W + x
+        self.occ[idx >> 3] &= ~(1 << (idx & 7))
 
     def _rand_empty_cell(self):
         for _ in range(200):
@@ -906,10 +1122,17 @@ class SnakeScreen(Screen):
             y = urandom.getrandbits(5) % self.GRID_H     # 0..GRID_H-1
             if self._cell_free(x, y):
                 return (x, y)
-        for yy in range(self.GRID_H):
-            for xx in range(self.GRID_W):
-                if self._cell_free(xx, yy):
-                    return (xx, yy)
+        # first free cell in row order, skipping fully covered bytes
+        occ = self.occ
+        for i in range(len(occ)):
+            b = occ[i]
+            if b != 0xFF:
+                for bit in range(8):
+                    if not b & (1 << bit):
+                        idx = (i << 3) + bit
+                        if idx < self.GRID_W * self.GRID_H:
+                            return (idx % self.GRID_W, idx // self.GRID_W)
+                        break
         return (0, 0)
 
     def _turn_left(self):
@@ -920,7 +1143,8 @@ class SnakeScreen(Screen):
 
     def _advance(self):
         dx, dy = self.DIRS[self.dir_idx]
-        hx, hy = self.snake[0]
+        head = self.head
+        hx, hy = self.xs[head], self.ys[head]
         nx, ny = hx + dx, hy + dy
 
         # grid-bounds collision
@@ -929,20 +1153,33 @@ class SnakeScreen(Screen):
             return
 
         # self collision
-        if (nx, ny) in self.snake:
+        if not self._cell_free(nx, ny):
             self._end_game()
             return
 
         # move
-        self.snake.insert(0, (nx, ny))
+        head = (head - 1) % len(self.xs)
+        self.xs[head] = nx
+        self.ys[head] = ny
+        self._set_cell(nx, ny)
+        self.head = head
+        self.length += 1
 
         # eat
-        if (nx, ny) == self.food:
+        fx, fy = self.food
+        if nx == fx and ny == fy:
             self.score += 1
             self.tick_ms = max(self.tick_ms_min, self.tick_ms_base - self.score * 6)
             self.food = self._rand_empty_cell()
+            tx = ty = -1
         else:
-            self.snake.pop()
+            tail = (head + self.length - 1) % len(self.xs)
+            tx, ty = self.xs[tail], self.ys[tail]
+            self._clear_cell(tx, ty)
+            self.length -= 1
+        # cells render_diff() has to touch: old head, new head, dropped tail
+        # (-1 when the snake ate and grew instead)
+        self._step = (hx, hy, nx, ny, tx, ty)
 
     def _end_game(self):
         self.game_over = True
@@ -950,27 +1187,37 @@ class SnakeScreen(Screen):
             self.high_score = self.score
             try:
                 snake_high_score.value = self.high_score
-                save_params()
+                schedule_save()
             except Exception:
                 pass
         # show overlay immediately
         self.render()
 
     async def _loop(self):
+        advance = self._advance
+        render_diff = self.render_diff
+        sleep_ms = asyncio.sleep_ms
         try:
             while self.running:
                 if not self.paused and not self.game_over:
-                    self._advance()
-                    self.render()
-                await asyncio.sleep_ms(self.tick_ms)
+                    advance()
+                    if not self.game_over:  # game over has rendered in full
+                        render_diff()
+                await sleep_ms(self.tick_ms)
         except asyncio.CancelledError:
             return
 
     # ---------- drawing ----------
-    def _draw_hud(self):
-        # Clear HUD band
-        self.oled.fill_rect(0, 0, self.oled.width, self.HUD_H, 0)
+    def _draw_borders(self, fb):
+        # Top border (under HUD)
+        fb.hline(0, self.HUD_H - 1, self.oled.width, 1)
+        # Left/right verticals span the full playfield height.
+        fb.vline(self.x_left,  self.y_top, self.y_bot - self.y_top + 1, 1)
+        fb.vline(self.x_right, self.y_top, self.y_bot - self.y_top + 1, 1)
+        # Bottom border
+        fb.hline(0, self.y_bot, self.oled.width, 1)
 
+    def _draw_hud(self):
         # Left: score
         wri6.set_textpos(self.oled, 0, 0)
         wri6.printstring("SCORE:{:d}".format(self.score))
@@ -981,7 +1228,7 @@ class SnakeScreen(Screen):
         wri6.set_textpos(self.oled, 0, x_hi)
         wri6.printstring(hi_txt)
 
-        # Top border (under HUD)
+        # glyph cells are as tall as the HUD and blank the separator under text
         self.oled.hline(0, self.HUD_H - 1, self.oled.width, 1)
 
     def render(self):
@@ -995,13 +1242,19 @@ class SnakeScreen(Screen):
         self.oled.fill_rect(fx*self.CELL, self.GRID_Y0 + fy*self.CELL, self.CELL, self.CELL, 1)
 
         # Snake
-        for i, (x, y) in enumerate(self.snake):
-            px = x * self.CELL
-            py = self.GRID_Y0 + y * self.CELL
-            if i == 0:
+        xs, ys = self.xs, self.ys
+        cap = len(xs)
+        i = self.head
+        for k in range(self.length):
+            px = xs[i] * self.CELL
+            py = self.GRID_Y0 + ys[i] * self.CELL
+            if k == 0:
                 self.oled.fill_rect(px, py, self.CELL, self.CELL, 1)
             else:
                 self.oled.rect(px, py, self.CELL, self.CELL, 1)
+            i += 1
+            if i == cap:
+                i = 0
 
         # Overlays
         if self.paused:
@@ -1010,14 +1263,38 @@ class SnakeScreen(Screen):
             self._overlay_gameover()
 
         # --- Draw playfield borders LAST so they stay visible ---
-        # Left/right verticals span the full playfield height.
-        self.oled.vline(self.x_left,  self.y_top, self.y_bot - self.y_top + 1, 1)
-        self.oled.vline(self.x_right, self.y_top, self.y_bot - self.y_top + 1, 1)
-        # Bottom border
-        self.oled.hline(0, self.y_bot, self.oled.width, 1)
+        self._draw_borders(self.oled)
 
         self.oled.show()
 
+    def render_diff(self):
+        """Update only the cells the last step changed, on top of the previous frame."""
+        hx, hy, nx, ny, tx, ty = self._step
+        c = self.CELL
+        y0 = self.GRID_Y0
+        oled = self.oled
+
+        if tx >= 0:
+            oled.fill_rect(tx * c, y0 + ty * c, c, c, 0)
+            # edge cells share their outer pixels with the border
+            if tx == 0 or tx == self.GRID_W - 1 or ty == self.GRID_H - 1:
+                self._draw_borders(oled)
+        # old head turns into a body outline, new head is filled
+        oled.fill_rect(hx * c + 1, y0 + hy * c + 1, c - 2, c - 2, 0)
+        oled.fill_rect(nx * c, y0 + ny * c, c, c, 1)
+        if tx < 0:
+            # ate: new food and score
+            fx, fy = self.food
+            oled.fill_rect(fx * c, y0 + fy * c, c, c, 1)
+            blank = self._hud_blank
+            oled.buffer[:len(blank)] = blank
+            if self.HUD_H & 7:
+                # rows of a page shared with the playfield
+                oled.fill_rect(0, len(blank) // oled.width * 8, oled.width, self.HUD_H & 7, 0)
+            self._draw_hud()
+
+        oled.show()
+
     def _overlay_center(self, text):
         """Draw a single-line centered overlay; safely clamps width."""
         pad = 2
@@ -1025,11 +1302,7 @@ class SnakeScreen(Screen):
         max_text_w = self.oled.width - 2 * pad
 
         # Clamp/ellipsize if too wide
-        if wri6.stringlen(text) > max_text_w:
-            base = text
-            while base and wri6.stringlen(base + "...") > max_text_w:
-                base = base[:-1]
-            text = (base + "...") if base else "..."
+        text = self._ellipsize(wri6, text, max_text_w)
 
         tw = wri6.stringlen(text)
         box_w = min(self.oled.width, tw + 2 * pad)
@@ -1059,16 +1332,7 @@ class SnakeScreen(Screen):
         fh = wri6.font.height()
 
         # Ellipsize each line if needed
-        trimmed = []
-        for s in lines:
-            if wri6.stringlen(s) <= self.oled.width - 2 * pad:
-                trimmed.append(s)
-            else:
-                base = s
-                while base and wri6.stringlen(base + "...") > self.oled.width - 2 * pad:
-                    base = base[:-1]
-                trimmed.append((base + "...") if base else "...")
-        lines = trimmed
+        lines = [self._ellipsize(wri6, s, self.oled.width - 2 * pad) for s in lines]
 
         max_line_w = max(wri6.stringlen(s) for s in lines)
         box_w = min(self.oled.width, max_line_w + 2 * pad)
@@ -1470,8 +1734,7 @@ class MenuScreen(Screen):
 # -----------------------
 # NeoPixel effects
 # -----------------------
-def hsv_to_rgb(h, s, v):
-    """Convert hue [0–360], saturation [0–1], value [0–1] to RGB tuple."""
+def _hsv_to_rgb(h, s, v):
     h = h % 360
     c = v * s
     x = c * (1 - abs((h / 60) % 2 - 1))
@@ -1494,6 +1757,109 @@ def hsv_to_rgb(h, s, v):
             int((g + m) * 255),
             int((b + m) * 255))
 
+# RGB of every whole hue at the Saturation/Brightness settings, so effects using the
+# settings as they are look colors up instead of converting them per pixel.
+# Entries are in the NeoPixel buffer's byte order, so they can be copied straight in.
+_HUE_TABLE = bytearray(360 * 3)
+_R, _G, _B = neopixel.NeoPixel.ORDER[:3]
+_hue_table_s = None
+_hue_table_v = None
+
+def update_hue_table():
+    global _hue_table_s, _hue_table_v
+    s = led_sat.value / 100
+    v = led_brightness.value / 100
+    if s == _hue_table_s and v == _hue_table_v:
+        return
+    for h in range(360):
+        r, g, b = _hsv_to_rgb(h, s, v)
+        _HUE_TABLE[3 * h + _R] = r
+        _HUE_TABLE[3 * h + _G] = g
+        _HUE_TABLE[3 * h + _B] = b
+    _hue_table_s, _hue_table_v = s, v
+
+def hsv_to_rgb(h, s, v):
+    """Convert hue [0–360], saturation [0–1], value [0–1] to RGB tuple."""
+    if s != _hue_table_s or v != _hue_table_v:
+        return hsv_to_rgb_u8(int(h) % 360, int(s * 255), int(v * 255))
+    o = 3 * (int(h) % 360)
+    return (_HUE_TABLE[o + _R], _HUE_TABLE[o + _G], _HUE_TABLE[o + _B])
+
+try:
+    from ledfast import fade_buf, hue_fill, palette_fill, hsv_to_rgb_u8, scale_fill
+except SyntaxError:  # no viper emitter in this firmware
+    def fade_buf(buf, n, q):
+        """Scale the first n bytes of a NeoPixel buffer by q/256 in place."""
+        for k in range(n):
+            b = buf[k]
+            if b:  # trails go dark, skip bytes that already are
+                buf[k] = (b * q) >> 8
+
+    def hue_fill(buf, table, base, pos):
+        """Give pixel i the table entry of hue base[i] + pos."""
+        for i in range(len(base)):
+            t = 3 * ((base[i] + pos) % 360)
+            buf[3 * i:3 * i + 3] = table[t:t + 3]
+
+    def palette_fill(buf, palette, pattern, shift, n):
+        """Give each of the n pixels i the palette entry pattern[(i + shift) % len(pattern)]."""
+        plen = len(pattern)
+        for i in range(n):
+            t = 3 * pattern[(i + shift) % plen]
+            buf[3 * i:3 * i + 3] = palette[t:t + 3]
+
+    def hsv_to_rgb_u8(h, s, v):
+        """Integer HSV to RGB: hue [0–360), saturation and value [0–255]."""
+        region = h // 60
+        rem = (h - region * 60) * 255 // 60
+        p = v * (255 - s) // 255
+        if region & 1:
+            c = v * (255 - s * rem // 255) // 255              # falling edge
+        else:
+            c = v * (255 - s * (255 - rem) // 255) // 255      # rising edge
+        if region == 0:
+            return (v, c, p)
+        if region == 1:
+            return (c, v, p)
+        if region == 2:
+            return (p, v, c)
+        if region == 3:
+            return (p, c, v)
+        if region == 4:
+            return (c, p, v)
+        return (v, p, c)
+
+    def scale_fill(buf, color, levels, n):
+        """Give pixel i the color (in buffer order) scaled by levels[i]/255."""
+        c0, c1, c2 = color
+        for i in range(n):
+            l = levels[i]
+            o = 3 * i
+            buf[o] = c0 * l // 255
+            buf[o + 1] = c1 * l // 255
+            buf[o + 2] = c2 * l // 255
+
+# scratch inputs for scale_fill: one color in buffer order and per-pixel levels
+_fill_color = bytearray(3)
+_fill_levels = bytearray(NEOPIXEL_COUNT)
+
+def set_fill_color(rgb):
+    _fill_color[_R], _fill_color[_G], _fill_color[_B] = rgb
+
+def to_wire(rgb):
+    """rgb reordered to the byte order of np.buf, for writing pixels directly."""
+    w = [0, 0, 0]
+    w[_R], w[_G], w[_B] = rgb
+    return tuple(w)
+
+# hue of each pixel in the rainbow, evenly spread around the ring
+_BASE_HUE = array.array('H', [(i * 360) // NEOPIXEL_COUNT for i in range(NEOPIXEL_COUNT)])
+
+def fade_q8(speed):
+    # Faster speed -> slightly less fade; slower speed -> more persistence.
+    # 256 * (0.5 + 0.4 * (maxval - speed) / maxval), in integers
+    return 128 + (led_speed.maxval - speed) * 512 // (5 * led_speed.maxval)
+
 def led_eff_off(np, oldstate):
     np.fill((0,0,0))
     return oldstate
@@ -1501,27 +1867,30 @@ def led_eff_off(np, oldstate):
 def led_eff_rainbow(np, oldstate):
     """Rainbow running around the circle"""
     pos = oldstate or 0
-    for i in range(len(np)):
-        pixel_hue = ((i * 360 // len(np)) + pos) % 360
-        np[i] = hsv_to_rgb(pixel_hue, led_sat.value/100, led_brightness.value/100)
+    # the hue table is built for the current Saturation/Brightness each frame
+    hue_fill(np.buf, _HUE_TABLE, _BASE_HUE, int(pos))
     return (pos + led_speed.value/10) % 360
 
+# Trans flag bands around the ring, one palette index (cyan, pink, white) per pixel
+_TRANS_PATTERN = bytes((0, 0, 1, 1, 2, 2, 1, 1, 0, 0, 1, 1, 2, 2, 1, 1))
+_trans_palette = bytearray(9)  # the three colors in buffer order
+_trans_key = None              # (saturation, brightness) the palette was built for
+
 def led_eff_rainbow2(np, oldstate):
     """Trans flag"""
+    global _trans_key
     pos = oldstate or 0
-    n = len(np)
 
-    # Define flag colors (hue, saturation)
-    white = (0, 0)
-    pink = (348, led_sat.value / 100)
-    cyan = (197, led_sat.value / 100)
-    cls = [cyan, cyan, pink, pink, white, white, pink, pink, cyan, cyan, pink, pink, white, white, pink, pink]
+    # Define flag colors, only when the settings change
+    key = (led_sat.value, led_brightness.value)
+    if key != _trans_key:
+        v = led_brightness.value / 100
+        s = led_sat.value / 100
+        for k, rgb in enumerate((hsv_to_rgb(197, s, v), hsv_to_rgb(348, s, v), hsv_to_rgb(0, 0, v))):
+            _trans_palette[3 * k:3 * k + 3] = bytes(to_wire(rgb))
+        _trans_key = key
 
-    for i in range(n):
-        # Determine which of the 8 bands this LED is in
-        band_idx = (i + int(pos / 30)) % len(cls)
-        hue, sat = cls[band_idx]
-        np[i] = hsv_to_rgb(hue, sat, led_brightness.value / 100)
+    palette_fill(np.buf, _trans_palette, _TRANS_PATTERN, int(pos / 30), NEOPIXEL_COUNT)
 
     # advance rotation
     return (pos + led_speed.value / 10) % 360
@@ -1529,11 +1898,19 @@ def led_eff_rainbow2(np, oldstate):
 
 def led_eff_breathe(np, oldstate):
     """All LEDs smoothly brighten and dim"""
-    br, d = oldstate or (0, 1)
-    rgb = hsv_to_rgb(led_hue.value, led_sat.value/100, br*led_brightness.value/100)
-
-    for i in range(len(np)):
-        np[i] = rgb
+    # [level, direction, last color, last frame]
+    state = oldstate or [0, 1, None, bytearray(len(np.buf))]
+    br, d, prev_rgb, last = state
+    # the scaled brightness is never on the hue table, convert in integers
+    rgb = hsv_to_rgb_u8(led_hue.value % 360, led_sat.value * 255 // 100,
+                        int(br * led_brightness.value * 255) // 100)
+
+    # the 8-bit color often holds for several frames at low brightness;
+    # refill only if it changed or something else drew over the ring
+    if rgb != prev_rgb or np.buf != last:
+        np.fill(rgb)
+        last[:] = np.buf
+        state[2] = rgb
     br += d * led_speed.value / 1000
     if br >= 1.0:
         br = 1.0
@@ -1541,30 +1918,36 @@ def led_eff_breathe(np, oldstate):
     elif br <= 0.0:
         br = 0.0
         d = 1
-    return (br, d)
+    state[0] = br
+    state[1] = d
+    return state
 
 def led_eff_comet(np, oldstate, tail=5):
     """Single bright dot with fading tail"""
     state = oldstate or 0
-    head_idx = int(state) % len(np)
-    fade_coeff = 0.5 + ((led_speed.maxval - led_speed.value) / led_speed.maxval * 0.4)
+    n = NEOPIXEL_COUNT
+    speed = led_speed.value
+    head_idx = int(state) % n
     # fade all LEDs slightly
-    for i in range(len(np)):
-        np[i] = tuple(int(x * fade_coeff) for x in np[i])
-    # light the comet head
-    np[head_idx] = hsv_to_rgb(led_hue.value, led_sat.value/100, led_brightness.value/100)
+    buf = np.buf
+    fade_buf(buf, len(buf), fade_q8(speed))
+    # light the comet head, its color is in the hue table already in buffer order
+    o = 3 * (led_hue.value % 360)
+    buf[3 * head_idx:3 * head_idx + 3] = _HUE_TABLE[o:o + 3]
 
-    return state + led_speed.value / 100
+    return state + speed / 100
 
 
 def led_eff_boxmein(np, oldstate):
     """custom effect"""
     state = oldstate or 0
-    ln = len(np)
+    ln = NEOPIXEL_COUNT
     head_idx = int(state / 100) % (ln * 3)
-    red = hsv_to_rgb(0, led_sat.value / 100, led_brightness.value / 100)
-    green = hsv_to_rgb(110, led_sat.value / 100, led_brightness.value / 100)
-    blue = hsv_to_rgb(225, led_sat.value / 100, led_brightness.value / 100)
+    s = led_sat.value / 100
+    v = led_brightness.value / 100
+    red = hsv_to_rgb(0, s, v)
+    green = hsv_to_rgb(110, s, v)
+    blue = hsv_to_rgb(225, s, v)
 
     np[head_idx % ln] = red if head_idx < ln else green if head_idx < 2 * ln else blue
 
@@ -1577,12 +1960,11 @@ def led_eff_ment(np, oldstate, tail=5):
     red = 0
     blue = 225
 
-    for i in range(len(np)):
-        np[i] = hsv_to_rgb(
-            red if (state % 1000) < 500 else blue,
-            led_sat.value / 100,
-            led_brightness.value / 100
-        )
+    np.fill(hsv_to_rgb(
+        red if (state % 1000) < 500 else blue,
+        led_sat.value / 100,
+        led_brightness.value / 100
+    ))
 
     return state + led_speed.value
 
@@ -1593,17 +1975,19 @@ def led_eff_ment2(np, oldstate, tail=5):
     red = 0
     blue = 225
 
-    for i in range(len(np)):
-        c1 = state % 6 < 3
+    buf = np.buf
+    s = led_sat.value / 100
+    v = led_brightness.value / 100
+    c1 = state % 6 < 3
+    base = to_wire(hsv_to_rgb(red, s, v)) if c1 else (0, 0, 0)
+    accent = to_wire(hsv_to_rgb(blue, s, v))
+    for i in range(NEOPIXEL_COUNT):
         c2 = (state + i) % 4 < 1
-
-        color = (0, 0, 0)
-        if c1:
-            color = hsv_to_rgb(red, led_sat.value / 100, led_brightness.value / 100)
-        if c2:
-            color = hsv_to_rgb(blue, led_sat.value / 100, led_brightness.value / 100)
-
-        np[i] = color
+        w0, w1, w2 = accent if c2 else base
+        o = 3 * i
+        buf[o] = w0
+        buf[o + 1] = w1
+        buf[o + 2] = w2
 
     return state + led_speed.value / 100
 
@@ -1615,19 +1999,21 @@ def led_eff_jumppa(np, oldstate, tail=5):
     state = oldstate or 0
     coef = int(led_speed.value / 10)  # ? led_speed.maxval ?
 
-    prev_state = state - 1 if state - 1 >= 0 else len(np) - 1
+    prev_state = state - 1 if state - 1 >= 0 else NEOPIXEL_COUNT - 1
 
-    idx1 = int(prev_state * coef) % len(np)
-    idx2 = len(np) - 1 - (int(prev_state * coef) % len(np))
+    idx1 = int(prev_state * coef) % NEOPIXEL_COUNT
+    idx2 = NEOPIXEL_COUNT - 1 - (int(prev_state * coef) % NEOPIXEL_COUNT)
 
     np[idx1] = (0, 0, 0)
     np[idx2] = (0, 0, 0)
 
-    idx1 = int(state * coef) % len(np)
-    idx2 = len(np) - 1 - (int(state * coef) % len(np))
+    idx1 = int(state * coef) % NEOPIXEL_COUNT
+    idx2 = NEOPIXEL_COUNT - 1 - (int(state * coef) % NEOPIXEL_COUNT)
 
-    np[idx1] = hsv_to_rgb(green, led_sat.value / 100, led_brightness.value / 100)
-    np[idx2] = hsv_to_rgb(blue, led_sat.value / 100, led_brightness.value / 100)
+    s = led_sat.value / 100
+    v = led_brightness.value / 100
+    np[idx1] = hsv_to_rgb(green, s, v)
+    np[idx2] = hsv_to_rgb(blue, s, v)
 
     return state + 1
 
@@ -1655,9 +2041,17 @@ def led_eff_galery(np, oldstate, screen: GalleryScreen):
     if SRGB_LUT_BR != led_brightness.value:
         SRGB_LUT = build_srgb_to_linear_lut(led_brightness.value)
         SRGB_LUT_BR = led_brightness.value
-    for i in range(len(np)):
-        if screen.current_colors:
-            np[i] = [SRGB_LUT[u] for u in screen.current_colors[i]]
+    colors = screen.current_colors
+    if colors:
+        lut = SRGB_LUT
+        buf = np.buf
+        R, G, B = _R, _G, _B
+        for i in range(NEOPIXEL_COUNT):
+            r, g, b = colors[i]
+            o = 3 * i
+            buf[o + R] = lut[r]
+            buf[o + G] = lut[g]
+            buf[o + B] = lut[b]
     return oldstate
 
 
@@ -1666,11 +2060,12 @@ def led_eff_startup(np, oldstate):
 
     rgb_on = hsv_to_rgb(led_hue.value, led_sat.value/100, led_brightness.value/100)
     rgb_off = (0,0,0)
-    for i in range(len(np)):
-        rgb = rgb_on if (i <= head) == (phase == 0) else rgb_off
-        np[i] = rgb
+    # lit up to head in the first pass, dark up to head in the second
+    lead, rest = (rgb_on, rgb_off) if phase == 0 else (rgb_off, rgb_on)
+    np.fill(rest)
+    np.buf[:3 * (head + 1)] = bytes(to_wire(lead)) * (head + 1)
 
-    if head < len(np) - 1:
+    if head < NEOPIXEL_COUNT - 1:
         return (head + 1, phase)
     elif phase == 0:
         return (0, 1)
@@ -1683,20 +2078,21 @@ def led_eff_autocycle(np, oldstate):
     Automatically cycles through all effects every minute.
     Reuse the existing led_effect functions one by one.
     """
-    state = oldstate or {"idx": 1, "timer": time.ticks_ms(), "inner": None}
+    # [effect index, time it started, its state]
+    state = oldstate or [1, time.ticks_ms(), None]
     now = time.ticks_ms()
 
     # every 60 seconds go to next effect (skip index 0 = Off)
-    if time.ticks_diff(now, state["timer"]) > 60_000:
-        state["idx"] += 1
-        if state["idx"] >= len(led_effects):
-            state["idx"] = 1        # wrap around, stay above 0
-        state["timer"] = now
-        state["inner"] = None       # reset inner effect state
+    if time.ticks_diff(now, state[1]) > 60_000:
+        state[0] += 1
+        if state[0] >= len(led_effects):
+            state[0] = 1            # wrap around, stay above 0
+        state[1] = now
+        state[2] = None             # reset inner effect state
 
     # run the current inner effect
-    effect_fn = led_effects[state["idx"]][1]
-    state["inner"] = effect_fn(np, state["inner"])
+    effect_fn = led_effects[state[0]][1]
+    state[2] = effect_fn(np, state[2])
     return state
 
 
@@ -1705,26 +2101,25 @@ def led_eff_rainbow_comet(np, oldstate):
     A comet that runs around the ring while its color cycles through the rainbow.
     The trail fades naturally, preserving past hues for a multicolor tail.
     """
-    # state keeps a sub-pixel position and a hue
-    state = oldstate or {"pos": 0.0, "hue": 0}
+    # state keeps a sub-pixel position and a hue, updated in place
+    state = oldstate or array.array('f', (0.0, 0.0))
+    pos, hue = state
+    n = NEOPIXEL_COUNT
+    speed = led_speed.value
 
     # Where's the head right now?
-    head_idx = int(state["pos"]) % len(np)
+    head_idx = int(pos) % n
 
     # Fade existing LEDs slightly to create a tail
-    # Faster speed -> slightly less fade; slower speed -> more persistence
-    fade_coeff = 0.5 + ((led_speed.maxval - led_speed.value) / led_speed.maxval * 0.4)
-    for i in range(len(np)):
-        r, g, b = np[i]
-        np[i] = (int(r * fade_coeff), int(g * fade_coeff), int(b * fade_coeff))
+    fade_buf(np.buf, len(np.buf), fade_q8(speed))
 
     # Set the head with the current rainbow hue
-    rgb = hsv_to_rgb(state["hue"], led_sat.value/100, led_brightness.value/100)
+    rgb = hsv_to_rgb(hue, led_sat.value/100, led_brightness.value/100)
     np[head_idx] = rgb
 
     # Advance position and hue based on Speed
-    state["pos"] += led_speed.value / 100     # movement per frame
-    state["hue"] = (state["hue"] + max(1, int(led_speed.value / 10))) % 360
+    state[0] = pos + speed / 100     # movement per frame
+    state[1] = (hue + max(1, int(speed / 10))) % 360
 
     return state
 
@@ -1733,20 +2128,18 @@ def led_eff_ping_pong(np, oldstate):
     """
     Two bouncing heads with fading tails (like a KITT/Cylon sweep on a ring).
     """
-    n = len(np)
-    state = oldstate or {"pos": 0.0, "dir": 1}
+    n = NEOPIXEL_COUNT
+    speed = led_speed.value
+    # [pos, dir], updated in place
+    state = oldstate or array.array('f', (0.0, 1.0))
+    pos, dir_ = state
 
     # Fade existing pixels for trailing effect
-    fade = 0.5 + ((led_speed.maxval - led_speed.value) / led_speed.maxval * 0.4)
-    for i in range(n):
-        r, g, b = np[i]
-        np[i] = (int(r * fade), int(g * fade), int(b * fade))
+    fade_buf(np.buf, len(np.buf), fade_q8(speed))
 
     # Primary head position (linear, reflecting at ends)
-    pos = state["pos"]
-    dir_ = state["dir"]
-    speed = max(0.05, led_speed.value / 100)  # movement per frame
-    pos += dir_ * speed
+    step = max(0.05, speed / 100)  # movement per frame
+    pos += dir_ * step
     if pos <= 0:
         pos = 0
         dir_ = 1
@@ -1762,93 +2155,145 @@ def led_eff_ping_pong(np, oldstate):
     np[head1] = rgb
     np[head2] = rgb
 
-    state["pos"], state["dir"] = pos, dir_
+    state[0] = pos
+    state[1] = dir_
     return state
 
 
+# 0.5 * (1 + sin(angle)) sampled at 256 steps per turn, for the wave effects.
+# Angles are in steps: pixel i of the ring sits at _RING_STEP[i], and radians
+# convert with _RAD_TO_STEP. Masking with 0xFF wraps any step, negative too.
+TWO_PI = 2 * math.pi
+# only a quarter turn of sin is stored in float; the rest follows by symmetry
+_QSIN = array.array('f', [math.sin(TWO_PI * k / 256) for k in range(65)])
+
+def _wave_at(k):
+    q = (k >> 6) & 3
+    j = k & 63
+    s = _QSIN[64 - j] if q & 1 else _QSIN[j]
+    return 0.5 * (1 - s) if q & 2 else 0.5 * (1 + s)
+
+# the wave scaled to 0..255, for integer-only mixing
+_WAVE8 = bytes(int(255 * _wave_at(k) + 0.5) for k in range(256))
+_RING_STEP = array.array('H', [i * 256 // NEOPIXEL_COUNT for i in range(NEOPIXEL_COUNT)])
+_RAD_TO_STEP = 256 / TWO_PI
+# per-pixel hues worked out in Python, for hue_fill to copy the colors in
+_pixel_hue = array.array('H', [0] * NEOPIXEL_COUNT)
+
 def led_eff_dual_hue(np, oldstate):
     """
     Opposite halves blend Hue -> Hue+180, rotating slowly.
     """
-    state = oldstate or {"phase": 0.0}
-    n = len(np)
+    # [phase, inputs of the last frame, last frame]
+    state = oldstate or [0.0, None, bytearray(len(np.buf))]
+    phase, prev_key, last = state
+    n = NEOPIXEL_COUNT
 
     hue_a = led_hue.value % 360
     hue_b = (hue_a + 180) % 360
-    s = led_sat.value / 100
-    v = led_brightness.value / 100
-
-    for i in range(n):
-        # angle around ring with a rotating offset
-        a = (2 * math.pi * i / n) + state["phase"]
-        # smooth, mirrored gradient: 1 on one side, 0 on the opposite side
-        m = 0.5 * (1 + math.cos(a))  # 1..0..1 around the circle
-        # interpolate hue between A and B by m
-        # (distance <= 180 so simple lerp is fine)
-        hue = (hue_a * m + hue_b * (1 - m)) % 360
-        np[i] = hsv_to_rgb(hue, s, v)
+    # colors at the Saturation/Brightness settings, already in buffer order
+    table = _HUE_TABLE
+    buf = np.buf
+    wave = _WAVE8
+    ring = _RING_STEP
+
+    # rotating offset; cos is sin a quarter turn (64 steps) ahead
+    ph = int(phase * _RAD_TO_STEP) + 64
+    # at low speeds the divider takes several frames per step; reuse the
+    # last frame unless an input moved or something else drew over the ring
+    key = (ph, hue_a, _hue_table_s, _hue_table_v)
+    if key != prev_key or buf != last:
+        hues = _pixel_hue
+        for i in range(n):
+            # smooth, mirrored gradient: 1 on one side, 0 on the opposite side
+            m = wave[(ring[i] + ph) & 0xFF]  # 255..0..255 around the circle
+            # interpolate hue between A and B by m
+            # (distance <= 180 so simple lerp is fine)
+            hues[i] = (hue_a * m + hue_b * (255 - m)) // 255 % 360
+        hue_fill(buf, table, hues, 0)
+        last[:] = buf
+        state[1] = key
 
     # rotate divider; Speed controls rotation rate
-    state["phase"] += led_speed.value / 400.0
+    state[0] = phase + led_speed.value / 400.0
     return state
 
 
+AURORA_HUE_G = const(130)   # green-ish
+AURORA_HUE_P = const(280)   # purple-ish
+
 def led_eff_aurora(np, oldstate):
     """
     Northern-lights style waves in green and purple.
     """
-    state = oldstate or {"p1": 0.0, "p2": 0.0}
-    n = len(np)
-
-    hue_g = 130   # green-ish
-    hue_p = 280   # purple-ish
-    s = (led_sat.value / 100) * 0.9
-    v_max = led_brightness.value / 100
-
+    # [p1, p2], updated in place so no new state is allocated per frame
+    state = oldstate or array.array('f', (0.0, 0.0))
+    p1, p2 = state
+    n = NEOPIXEL_COUNT
+
+    s = led_sat.value * 255 * 9 // 1000          # 90% of Saturation, 0..255
+    v_max = led_brightness.value * 255 // 100
+    v_lo = v_max // 4       # breathing between 25% and 100% of Brightness
+    v_span = v_max - v_lo
+
+    s1 = int(p1 * _RAD_TO_STEP)
+    s2 = int(p2 * _RAD_TO_STEP)
+    s3 = int(p2 / 2 * _RAD_TO_STEP)
+    buf = np.buf
+    wave = _WAVE8
+    ring = _RING_STEP
+    hsv = hsv_to_rgb_u8
+    R, G, B = _R, _G, _B
     for i in range(n):
-        x = 2 * math.pi * i / n
+        x = ring[i]
         # two gentle, offset waves
-        w1 = 0.5 * (1 + math.sin(x + state["p1"]))       # 0..1
-        w2 = 0.5 * (1 + math.sin(2 * x - state["p2"]))   # 0..1
+        w1 = wave[(x + s1) & 0xFF]       # 0..255
+        w2 = wave[(2 * x - s2) & 0xFF]   # 0..255
 
-        # color mix and brightness breathing
-        mix = 0.6 * w1 + 0.4 * (1 - w2)                  # 0..1
-        hue = (hue_g * mix + hue_p * (1 - mix)) % 360
-        v = (0.25 + 0.75 * (0.5 * (1 + math.sin(x*0.8 + state["p2"]/2)))) * v_max
+        # color mix and brightness breathing, all in 0..255
+        mix = (6 * w1 + 4 * (255 - w2)) // 10
+        hue = AURORA_HUE_P + (AURORA_HUE_G - AURORA_HUE_P) * mix // 255  # no wrap needed
+        v = v_lo + v_span * wave[(x * 4 // 5 + s3) & 0xFF] // 255
 
-        np[i] = hsv_to_rgb(hue, s, v)
+        r, g, b = hsv(hue, s, v)
+        o = 3 * i
+        buf[o + R] = r
+        buf[o + G] = g
+        buf[o + B] = b
 
     # slow evolving phases; Speed affects flow
     sp = max(0.05, led_speed.value / 200.0)
-    state["p1"] += sp * 0.6
-    state["p2"] += sp * 0.3
+    state[0] = p1 + sp * 0.6
+    state[1] = p2 + sp * 0.3
     return state
 
 
+SPIRAL_GAMMA = 1.6  # contrast
+# spiral_spin's brightness per wave step, contrast curve applied, 0..255
+_SPIRAL_LEVEL = bytes(int(255 * _wave_at(k) ** SPIRAL_GAMMA) for k in range(256))
+
 def led_eff_spiral_spin(np, oldstate):
     """
     Rotating brightness wave around the ring, giving a spiral illusion.
     """
-    state = oldstate or {"phase": 0.0}
-    n = len(np)
+    phase = oldstate or 0.0
+    n = NEOPIXEL_COUNT
     waves = 2  # try 1, 2, or 3 for different looks
-    gamma = 1.6  # contrast
 
-    s = led_sat.value/100
-    v_base = led_brightness.value/100
-    hue = led_hue.value
+    # only value changes along the ring, so scale one full-brightness color
+    set_fill_color(hsv_to_rgb(led_hue.value, led_sat.value/100, led_brightness.value/100))
+    levels = _fill_levels
+    level = _SPIRAL_LEVEL
+    ring = _RING_STEP
 
+    ph = int(phase * _RAD_TO_STEP)
     for i in range(n):
-        # normalized position around the ring
-        t = (i / n) * (2 * math.pi * waves) + state["phase"]
-        b = 0.5 * (1 + math.sin(t))              # 0..1
-        b = b ** gamma                           # contrast curve
-        r, g, b_rgb = hsv_to_rgb(hue, s, v_base * b)
-        np[i] = (r, g, b_rgb)
+        # position around the ring
+        levels[i] = level[(ring[i] * waves + ph) & 0xFF]
+    scale_fill(np.buf, _fill_color, levels, n)
 
     # Rotate the wave; speed controls angular velocity
-    state["phase"] += (led_speed.value / 200)    # tweak feel here
-    return state
+    return phase + (led_speed.value / 200)    # tweak feel here
 
 
 async def neopixel_task(np):
@@ -1857,8 +2302,13 @@ async def neopixel_task(np):
     global led_startup
     global screen
     t = None
-    prev_effect = 0
-    led_effects = [("Off", led_eff_off),
+    prev_effect = None
+    effect = None  # function of prev_effect, looked up when it changes
+    # what the LEDs currently show (init_neopixels left them dark); WS2812s
+    # latch, so an identical frame needs no write
+    shown = bytearray(len(np.buf))
+    deadline = time.ticks_add(time.ticks_ms(), FRAME_MS)
+    led_effects = (("Off", led_eff_off),
                    ("Rainbow", led_eff_rainbow),
                    ("Rainbow2", led_eff_rainbow2),
                    ("Breathe", led_eff_breathe),
@@ -1872,23 +2322,42 @@ async def neopixel_task(np):
                    ("ment", led_eff_ment),
                    ("ment2", led_eff_ment2),
                    ("boxmein", led_eff_boxmein),
-                   ("jumppa", led_eff_jumppa)]
+                   ("jumppa", led_eff_jumppa))
+    effects = led_effects
+    n_effects = len(effects)
+    write = np.write
+    buf = np.buf
+    sleep_ms = asyncio.sleep_ms
     while True:
+        update_hue_table()
         if led_startup == True:
             t = led_eff_startup(np, t)
             if t == None:
                 led_startup = False
         else:
-            if prev_effect != led_effect.value:
+            v = led_effect.value
+            if prev_effect != v:
                 t = None
-                prev_effect = led_effect.value
-            if led_effect.value in range(len(led_effects)):
-                t = led_effects[led_effect.value][1](np, t)
+                prev_effect = v
+                effect = effects[v][1] if 0 <= v < n_effects else None
+            if effect is not None:
+                t = effect(np, t)
             if isinstance(screen, GalleryScreen):
                 t = led_eff_galery(np, t, screen)
 
-        np.write()
-        await asyncio.sleep_ms(int(1000/NEOPIXEL_FPS))
+        if buf != shown:
+            write()
+            shown[:] = buf
+
+        # sleep until the next frame is due, so render time does not add to the period
+        delay = time.ticks_diff(deadline, time.ticks_ms())
+        if delay > 0:
+            await sleep_ms(delay)
+            deadline = time.ticks_add(deadline, FRAME_MS)
+        else:
+            # running late: drop the missed frames instead of trying to catch up
+            await sleep_ms(0)
+            deadline = time.ticks_add(time.ticks_ms(), FRAME_MS)
 
 # -----------------------
 # UI manager
@@ -1913,54 +2382,71 @@ def wrap_text(text, writer, max_width, max_height):
     line_height = writer.font.height()
     max_rows = max_height // line_height
 
+    font = writer.font
+    glyph_w = glyph_widths(font)  # filled by text_width, read when splitting words
+
+    space_w = text_width(font, " ")
     words = text.split()
-    lines, line = [], ""
+    # words of the current line, joined once when it is complete
+    lines, line, line_w = [], [], 0
 
     for word in words:
+        word_w = text_width(font, word)
         # if a word itself is too long, split it at character level
-        while writer.stringlen(word) > max_width:
-            for i in range(1, len(word) + 1):
-                if writer.stringlen(word[:i]) > max_width:
-                    lines.append(word[:i-1])
-                    word = word[i-1:]
+        while word_w > max_width:
+            px = 0
+            for i in range(len(word)):
+                px += glyph_w[word[i]]
+                if px > max_width:
+                    lines.append(word[:i])
+                    word = word[i:]
+                    word_w -= px - glyph_w[word[0]]
                     break
-        test_line = (line + " " + word).strip()
-        if writer.stringlen(test_line) <= max_width:
-            line = test_line
+        needed = line_w + space_w + word_w if line else word_w
+        if needed <= max_width:
+            line.append(word)
+            line_w = needed
         else:
-            lines.append(line)
-            line = word
+            lines.append(" ".join(line))
+            line, line_w = [word], word_w
         if len(lines) >= max_rows:
             break
     if line and len(lines) < max_rows:
-        lines.append(line)
+        lines.append(" ".join(line))
 
     # truncate if too many lines
     if len(lines) > max_rows:
         lines = lines[:max_rows]
         # replace last line with ellipsis if there’s space
-        if writer.stringlen(lines[-1] + "...") <= max_width:
+        if text_width(font, lines[-1] + "...") <= max_width:
             lines[-1] += "..."
         else:
             lines[-1] = lines[-1][:-3] + "..."
 
     return lines
 
+def get_username_lines(name, writer, width, height):
+    """Wrapped and centred lines of name as ((y, x, line), ...), measured only once."""
+    key = (name, id(writer))
+    placed = _username_cache.get(key)
+    if placed is None:
+        lines = wrap_text(name, writer, width, height)
+        line_height = writer.font.height()
+        y = (height - len(lines) * line_height) // 2
+        placed = []
+        for line in lines:
+            placed.append((y, (width - writer.stringlen(line)) // 2, line))
+            y += line_height
+        placed = tuple(placed)
+        _username_cache.clear()  # only the current name is ever needed
+        _username_cache[key] = placed
+    return placed
+
 def show_username(oled, name):
-    global username_lines
     oled.fill(0)
-
-    if not username_lines:
-        username_lines = wrap_text(name, username_wri, oled.width, oled.height)
-    total_height = len(username_lines) * username_wri.font.height()
-    y = (oled.height - total_height) // 2
-
-    for line in username_lines:
-        x = (oled.width - username_wri.stringlen(line)) // 2
+    for y, x, line in get_username_lines(name, username_wri, oled.width, oled.height):
         username_wri.set_textpos(oled, y, x)
         username_wri.printstring(line)
-        y += username_wri.font.height()
-
     oled.show()
 
 async def inactivity_task(oled):
@@ -1968,12 +2454,18 @@ async def inactivity_task(oled):
     global last_activity
 
     starting = True
+    shown = False  # name is on the display since the last activity
     while True:
         inactive = (screen is None or isinstance(screen, MenuScreen)) and \
                    time.ticks_diff(time.ticks_ms(), last_activity) > INACTIVITY_TIMEOUT
         if inactive or starting:
+            # nothing else draws while idle, so only draw on becoming idle
+            if not shown:
+                show_username(oled, USERNAME)
+                shown = True
             starting = False
-            show_username(oled, USERNAME)
+        else:
+            shown = False
         await asyncio.sleep_ms(500)
 
 
@@ -1990,7 +2482,8 @@ async def main():
     load_params()
     print("Modded badge posts!")
 
-    await asyncio.gather(inactivity_task(oled), ui_task(oled), lyrics_task(oled), neopixel_task(np))
+    await asyncio.gather(inactivity_task(oled), ui_task(oled), lyrics_task(oled), neopixel_task(np),
+                         button_poll_task(), button_dispatch_task(), button_repeat_task())
 
 try:
     asyncio.run(main())
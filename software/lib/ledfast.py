@@ -0,0 +1,88 @@
+# Native inner loops for the NeoPixel effects in bsides25.py.
+# Imported inside try/except SyntaxError: firmware built without the viper
+# emitter rejects the decorators when compiling this module, and bsides25.py
+# then falls back to its plain Python versions.
+
+import micropython
+
+
+@micropython.viper
+def fade_buf(buf: ptr8, n: int, q: int):
+    # scale the first n bytes of buf by q/256 (q <= 256), four bytes per step:
+    # bytes 0 and 2 of a word are scaled in 16-bit lanes, then bytes 1 and 3,
+    # so no product carries into the next byte
+    words = ptr32(buf)
+    lo = 0x00FF00FF
+    hi = ~lo
+    w = n >> 2
+    for k in range(w):
+        x = words[k]
+        if x:  # trails go dark, skip words that already are
+            words[k] = ((((x & lo) * q) >> 8) & lo) | ((((x >> 8) & lo) * q) & hi)
+    for k in range(w << 2, n):
+        buf[k] = (buf[k] * q) >> 8
+
+
+@micropython.viper
+def hue_fill(buf: ptr8, table: ptr8, base, pos: int):
+    # pixel i gets the table entry of hue base[i] + pos; base is an array('H')
+    # of per-pixel hues, table is 360 3-byte entries already in the buffer's
+    # colour order
+    hues = ptr16(base)
+    for i in range(int(len(base))):
+        t = 3 * ((hues[i] + pos) % 360)
+        o = 3 * i
+        buf[o] = table[t]
+        buf[o + 1] = table[t + 1]
+        buf[o + 2] = table[t + 2]
+
+
+@micropython.viper
+def palette_fill(buf: ptr8, palette: ptr8, pattern, shift: int, n: int):
+    # each of the n pixels i gets the palette entry
+    # pattern[(i + shift) % len(pattern)], one byte per entry; palette entries
+    # are 3 bytes already in the buffer's colour order. buf must hold n pixels.
+    pat = ptr8(pattern)
+    plen = int(len(pattern))
+    for i in range(n):
+        t = 3 * pat[(i + shift) % plen]
+        o = 3 * i
+        buf[o] = palette[t]
+        buf[o + 1] = palette[t + 1]
+        buf[o + 2] = palette[t + 2]
+
+
+@micropython.viper
+def hsv_to_rgb_u8(h: int, s: int, v: int):
+    # hue [0-360), saturation and value [0-255]; integer-only HSV to RGB.
+    # The hue is not wrapped here, callers keep it in range.
+    region = h // 60
+    rem = (h - region * 60) * 255 // 60
+    p = v * (255 - s) // 255
+    if region & 1:
+        c = v * (255 - s * rem // 255) // 255              # falling edge
+    else:
+        c = v * (255 - s * (255 - rem) // 255) // 255      # rising edge
+    if region == 0:
+        return (v, c, p)
+    if region == 1:
+        return (c, v, p)
+    if region == 2:
+        return (p, v, c)
+    if region == 3:
+        return (p, c, v)
+    if region == 4:
+        return (c, p, v)
+    return (v, p, c)
+
+
+@micropython.viper
+def scale_fill(buf: ptr8, color: ptr8, levels: ptr8, n: int):
+    # pixel i gets color (3 bytes in the buffer's colour order) scaled by
+    # levels[i]/255
+    for i in range(n):
+        l = levels[i]
+        o = 3 * i
+        buf[o] = color[0] * l // 255
+        buf[o + 1] = color[1] * l // 255
+        buf[o + 2] = color[2] * l // 255
@@ -34,6 +34,9 @@ class SSD1306(framebuf.FrameBuffer):
         self.external_vcc = external_vcc
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
+        # what the panel currently shows; show() only sends what differs from it
+        self.prev_buf = bytearray(len(self.buffer))
+        self.prev_valid = False
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
         self.init_display()
 
@@ -81,6 +84,7 @@ class SSD1306(framebuf.FrameBuffer):
 
     def poweron(self):
         self.write_cmd(SET_DISP | 0x01)
+        self.prev_valid = False
 
     def contrast(self, contrast):
         self.write_cmd(SET_CONTRAST)
@@ -93,9 +97,7 @@ class SSD1306(framebuf.FrameBuffer):
         self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
         self.write_cmd(SET_SEG_REMAP | (rotate & 1))
 
-    def show(self):
-        x0 = 0
-        x1 = self.width - 1
+    def _set_window(self, x0, x1, p0, p1):
         if self.width != 128:
             # narrow displays use centred columns
             col_offset = (128 - self.width) // 2
@@ -105,9 +107,52 @@ class SSD1306(framebuf.FrameBuffer):
         self.write_cmd(x0)
         self.write_cmd(x1)
         self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_data(self.buffer)
+        self.write_cmd(p0)
+        self.write_cmd(p1)
+
+    def show(self):
+        w = self.width
+        buf = self.buffer
+        prev = self.prev_buf
+        if not self.prev_valid:
+            self._set_window(0, w - 1, 0, self.pages - 1)
+            self.write_data(buf)
+            prev[:] = buf
+            self.prev_valid = True
+            return
+        if buf == prev:
+            return  # one compare instead of slicing every page
+        mv = memoryview(buf)
+        for p in range(self.pages):
+            start = p * w
+            end = start + w
+            if buf[start:end] == prev[start:end]:
+                continue
+            # narrow the transfer down to the changed columns of this page
+            while buf[start] == prev[start]:
+                start += 1
+            while buf[end - 1] == prev[end - 1]:
+                end -= 1
+            self._set_window(start - p * w, end - 1 - p * w, p, p)
+            self.write_data(mv[start:end])
+            prev[start:end] = mv[start:end]
+
+    def show_region(self, x0, y0, x1, y1):
+        # transmit only the pages covering rows y0..y1, columns x0..x1 (inclusive)
+        p0 = y0 // 8
+        p1 = y1 // 8
+        self._set_window(x0, x1, p0, p1)
+        mv = memoryview(self.buffer)
+        prev = self.prev_buf
+        w = self.width
+        if x0 == 0 and x1 == w - 1:
+            # full-width pages are contiguous in the buffer, send them in one burst
+            self.write_data(mv[p0 * w:(p1 + 1) * w])
+            prev[p0 * w:(p1 + 1) * w] = mv[p0 * w:(p1 + 1) * w]
+        else:
+            for p in range(p0, p1 + 1):
+                self.write_data(mv[p * w + x0:p * w + x1 + 1])
+                prev[p * w + x0:p * w + x1 + 1] = mv[p * w + x0:p * w + x1 + 1]
 
 
 class SSD1306_I2C(SSD1306):
@@ -115,6 +160,8 @@ class SSD1306_I2C(SSD1306):
         self.i2c = i2c
         self.addr = addr
         self.temp = bytearray(2)
+        # Co=0, D/C#=0: the rest of the transfer is a stream of command bytes
+        self.window_cmd = bytearray((0x00, SET_COL_ADDR, 0, 0, SET_PAGE_ADDR, 0, 0))
         self.write_list = [b"\x40", None]  # Co=0, D/C#=1
         super().__init__(width, height, external_vcc)
 
@@ -123,6 +170,19 @@ class SSD1306_I2C(SSD1306):
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
 
+    def _set_window(self, x0, x1, p0, p1):
+        # all six addressing bytes in one transaction instead of one per byte
+        if self.width != 128:
+            col_offset = (128 - self.width) // 2
+            x0 += col_offset
+            x1 += col_offset
+        cmd = self.window_cmd
+        cmd[2] = x0
+        cmd[3] = x1
+        cmd[5] = p0
+        cmd[6] = p1
+        self.i2c.writeto(self.addr, cmd)
+
     def write_data(self, buf):
         self.write_list[1] = buf
         self.i2c.writevto(self.addr, self.write_list)